@@ -1,18 +1,29 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import json
 import os
-import re
-from typing import List
+import queue
+import threading
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, AsyncIterator, Iterator, List
 
 import streamlit as st
 from dotenv import load_dotenv
+from pydantic import BaseModel, Field
 
-from langchain_core.prompts import PromptTemplate
-from langchain_core.runnables import RunnableLambda, RunnablePassthrough
-from langchain_core.output_parsers import StrOutputParser
-from langchain_openai import ChatOpenAI
+if TYPE_CHECKING:
+    import openai
+    from langchain_openai import ChatOpenAI
 
 # -------------------- Env & Basic --------------------
 load_dotenv()  # local dev: load .env
 OPENAI_API_KEY = (os.getenv("OPENAI_API_KEY") or "").strip() or None
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or "https://api.openai.com/v1"
+LLM_CACHE_PATH = os.path.join(os.path.dirname(__file__), ".langchain.db")
 
 st.set_page_config(
     page_title="Restaurant Name Generator",
@@ -22,6 +33,11 @@ st.set_page_config(
 
 HERO_TITLE = "Restaurant Name Generator"
 HERO_SUB = "Pick a cuisine on the left. Get a brandable name and a ready-to-use menu."
+# 按实际展示宽度（约 600px）请求，而不是 1200px 原图
+HERO_IMAGE_URL = (
+    "https://images.unsplash.com/photo-1526318472351-c75fcf070305"
+    "?q=80&w=600&auto=format&fit=crop"
+)
 
 # -------------------- UI – Header --------------------
 with st.container():
@@ -66,120 +82,197 @@ with st.sidebar:
 
 
 @st.cache_resource(show_spinner=False)
-def get_llm(temp: float, api_key: str) -> ChatOpenAI:
+def _lc() -> SimpleNamespace:
+    # 延迟导入：页头与侧边栏先渲染，第一次真正需要 LLM 时才加载 LangChain / OpenAI
+    import openai
+    from langchain_community.cache import SQLiteCache
+    from langchain_core.globals import set_llm_cache
+    from langchain_core.messages import convert_to_openai_messages
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_openai import ChatOpenAI
+
+    # 相同 prompt 的结果落盘，重启后 / 多用户之间都能命中。
+    # 注意：只有前台 invoke / ainvoke 会读写该缓存（结构化 details 调用）；
+    # stream / astream 直接请求模型；预取链用 cache=False 构建，否则同一菜系永远拿到同一个店名
+    set_llm_cache(SQLiteCache(database_path=LLM_CACHE_PATH))
+    return SimpleNamespace(
+        openai=openai,
+        ChatOpenAI=ChatOpenAI,
+        ChatPromptTemplate=ChatPromptTemplate,
+        StrOutputParser=StrOutputParser,
+        convert_to_openai_messages=convert_to_openai_messages,
+    )
+
+
+async def _apreconnect(client: openai.DefaultAsyncHttpxClient) -> None:
+    # 尽力而为：失败只意味着首个请求自己握手
+    try:
+        await client.get(f"{OPENAI_BASE_URL}/models", timeout=1.0)
+    except Exception:
+        pass
+
+
+@st.cache_resource(show_spinner=False)
+def get_http_clients() -> tuple[openai.DefaultHttpxClient, openai.DefaultAsyncHttpxClient]:
+    # 所有 LLM 调用（含流式）都走后台 loop 上的异步 HTTP/2 连接池，并发请求在同一条连接上
+    # 多路复用；同步 client 只用于 Batch API 的文件 / 批任务请求
+    openai = _lc().openai
+    client = openai.DefaultHttpxClient(http2=True)
+    async_client = openai.DefaultAsyncHttpxClient(http2=True)
+    # 预连接：后台完成 DNS + TLS 握手（401 也无妨），首个真实请求直接复用连接。
+    # 只预热异步 client；同步 client 只服务于不敏感延迟的 Batch 请求
+    asyncio.run_coroutine_threadsafe(_apreconnect(async_client), get_event_loop())
+    return client, async_client
+
+
+@st.cache_resource(show_spinner=False)
+def get_llm(
+    temp: float, api_key: str, cache: bool = True, max_tokens: int | None = None
+) -> ChatOpenAI:
     # 轻量、便于复用
     if not api_key:
         raise ValueError("Missing OpenAI API key.")
-    return ChatOpenAI(
+    http_client, http_async_client = get_http_clients()
+    return _lc().ChatOpenAI(
         temperature=temp,
         openai_api_key=api_key,
         model="gpt-4o-mini",
+        cache=cache,
+        max_tokens=max_tokens,
+        http_client=http_client,
+        http_async_client=http_async_client,
     )
 
 
-parser = StrOutputParser()
+# 输出上限直接决定解码耗时：店名只需几个 token；结构化结果留足余量，避免 JSON 被截断
+SHORT_MAX_TOKENS = 32
+DETAILS_MAX_TOKENS = 512
 
-name_prompt = PromptTemplate(
-    input_variables=["cuisine"],
-    template=(
-        "You are a brand consultant. Give a short, catchy, brandable restaurant name "
-        "for {cuisine} cuisine. Return ONLY the name, no quotes or extra text."
-    ),
-)
-menu_prompt = PromptTemplate(
-    input_variables=["cuisine", "restaurant_name"],
-    template=(
-        "List 6 popular menu items for a {cuisine} restaurant named {restaurant_name}. "
-        "Return one item per line, no numbering."
-    ),
-)
 
-# --- New prompts ---
-drinks_prompt = PromptTemplate(
-    input_variables=["cuisine", "restaurant_name"],
-    template=(
-        "List 6 popular drink items for a {cuisine} restaurant named {restaurant_name}. "
-        "Include at least 2 non-alcoholic options. "
-        "Return one item per line, no numbering."
-    ),
+# 所有 prompt 共用同一条 system 消息：相同前缀可被服务端 prompt caching 复用
+SYSTEM_PROMPT = (
+    "You are a brand consultant and copywriter for restaurants. Respond concisely."
 )
 
-slogan_prompt = PromptTemplate(
-    input_variables=["restaurant_name", "cuisine"],
-    template=(
-        "You are a brand copywriter. Create a short, catchy slogan (max 6 words) "
-        "for a {cuisine} restaurant named {restaurant_name}. Return ONLY the slogan."
-    ),
-)
+NAME_MESSAGES = [
+    ("system", SYSTEM_PROMPT),
+    ("user", "Give a short, catchy, brandable restaurant name for {cuisine} cuisine. "
+             "Return ONLY the name, no quotes or extra text."),
+]
+
+
+class RestaurantDetails(BaseModel):
+    menu_items: List[str] = Field(description="6 popular menu items, no numbering.")
+    drink_items: List[str] = Field(
+        description="6 popular drink items, at least 2 non-alcoholic.")
+    slogan: str = Field(description="A short, catchy slogan (max 6 words).")
+
+
+# 一次请求返回全部短字段：共享的 cuisine / restaurant_name 上下文只需预填充一次
+DETAILS_MESSAGES = [
+    ("system", SYSTEM_PROMPT),
+    ("user", "For a {cuisine} restaurant named {restaurant_name}, provide:\n"
+             "- menu_items: 6 popular menu items\n"
+             "- drink_items: 6 popular drink items, including at least 2 non-alcoholic options\n"
+             "- slogan: a short, catchy slogan (max 6 words)"),
+]
+
+# 描述是最长的输出，单独成链以便流式渲染
+DESCRIPTION_MESSAGES = [
+    ("system", SYSTEM_PROMPT),
+    ("user", "Write a warm, vivid, 2–3 sentence description for a {cuisine} restaurant "
+             "named {restaurant_name}. Avoid clichés. No markdown or extra headings."),
+]
+
+
+# Batch API 一次请求生成完整方案（含店名与描述），不走流式
+class RestaurantConcept(RestaurantDetails):
+    restaurant_name: str = Field(
+        description="A short, catchy, brandable restaurant name, no quotes.")
+    description: str = Field(
+        description="A warm, vivid, 2–3 sentence description. No markdown.")
+
+
+CONCEPT_MESSAGES = [
+    ("system", SYSTEM_PROMPT),
+    ("user", "Create a restaurant concept for {cuisine} cuisine with:\n"
+             "- restaurant_name: a short, catchy, brandable name\n"
+             "- menu_items: 6 popular menu items\n"
+             "- drink_items: 6 popular drink items, including at least 2 non-alcoholic options\n"
+             "- slogan: a short, catchy slogan (max 6 words)\n"
+             "- description: a warm, vivid, 2–3 sentence description. Avoid clichés. "
+             "No markdown or extra headings."),
+]
 
-description_prompt = PromptTemplate(
-    input_variables=["restaurant_name", "cuisine"],
-    template=(
-        "Write a warm, vivid, 2–3 sentence description for a {cuisine} restaurant "
-        "named {restaurant_name}. Avoid clichés. No markdown or extra headings."
-    ),
-)
 
+@st.cache_resource(show_spinner=False)
+def get_prompts() -> SimpleNamespace:
+    from_messages = _lc().ChatPromptTemplate.from_messages
+    return SimpleNamespace(
+        name=from_messages(NAME_MESSAGES),
+        details=from_messages(DETAILS_MESSAGES),
+        description=from_messages(DESCRIPTION_MESSAGES),
+        concept=from_messages(CONCEPT_MESSAGES),
+    )
 
-def build_chain(llm: ChatOpenAI):
-    # existing sub-chains
-    name_chain = name_prompt | llm | parser
-    menu_chain = menu_prompt | llm | parser
 
-    # new sub-chains
-    drinks_chain = drinks_prompt | llm | parser
-    slogan_chain = slogan_prompt | llm | parser
-    description_chain = description_prompt | llm | parser
+def build_chain(llm: ChatOpenAI, short_llm: ChatOpenAI):
+    prompts = get_prompts()
+    parser = _lc().StrOutputParser()
+    name_chain = prompts.name | short_llm | parser
+    # 店名单独返回以便流式输出；其余字段合并为一次结构化输出调用
+    details_chain = prompts.details | llm.with_structured_output(RestaurantDetails)
+    description_chain = prompts.description | llm | parser
+    return name_chain, details_chain, description_chain
 
-    def build_menu(inputs):
-        prompt_inputs = {
-            "cuisine": inputs.get("cuisine", ""),
-            "restaurant_name": inputs.get("restaurant_name", ""),
-        }
-        return menu_chain.invoke(prompt_inputs)
 
-    def build_drinks(inputs):
-        prompt_inputs = {
-            "cuisine": inputs.get("cuisine", ""),
-            "restaurant_name": inputs.get("restaurant_name", ""),
-        }
-        return drinks_chain.invoke(prompt_inputs)
-
-    full_chain = (
-        RunnablePassthrough
-        .assign(restaurant_name=name_chain)
-        .assign(menu_items=RunnableLambda(build_menu))
-        .assign(drink_items=RunnableLambda(build_drinks))
-        .assign(slogan=slogan_chain)
-        .assign(description=description_chain)
+@st.cache_resource(show_spinner=False)
+def get_chain(temp: float, api_key: str, cache: bool = True):
+    # LCEL 组合（prompt | llm | parser）只需构建一次，按 LLM 配置复用
+    return build_chain(
+        get_llm(temp, api_key, cache=cache, max_tokens=DETAILS_MAX_TOKENS),
+        get_llm(temp, api_key, cache=cache, max_tokens=SHORT_MAX_TOKENS),
     )
-    return full_chain
 
-# -------------------- Helpers --------------------
 
+@st.cache_resource(show_spinner=False)
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    # 常驻后台事件循环：并发子链共享同一个 loop 与 httpx.AsyncClient 连接池，
+    # 避免每次 asyncio.run 新建/关闭 loop 导致连接无法复用
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
 
-LINE_CLEAN_RE = re.compile(
-    r"^\s*(?:[\u2022\-\*\u2013\u2014]+|\d+[.)\-\u2022]*)?\s*"
-)
-QUOTE_CLEAN_CHARS = "\"'“”‘’`"
-MAX_MENU_ITEMS = 6
 
+_STREAM_END = object()
 
-def normalize_lines(text: str | None) -> List[str]:
-    if not text:
-        return []
 
-    cleaned: List[str] = []
-    for raw_line in text.splitlines():
-        stripped = raw_line.strip()
-        if not stripped:
-            continue
-        normalized = LINE_CLEAN_RE.sub("", stripped, count=1).strip()
-        if normalized:
-            cleaned.append(normalized)
-    deduped = list(dict.fromkeys(cleaned))
-    # 保持简洁：最多展示指定数量的菜单
-    return deduped[:MAX_MENU_ITEMS]
+def stream_on_loop(chunks: AsyncIterator) -> Iterator:
+    # 在共享 loop 上消费 astream，逐块交给脚本线程渲染（st.* 只能在脚本线程里调用）
+    buffer: queue.Queue = queue.Queue()
+
+    async def pump() -> None:
+        try:
+            async for chunk in chunks:
+                buffer.put(chunk)
+        finally:
+            buffer.put(_STREAM_END)
+
+    future = asyncio.run_coroutine_threadsafe(pump(), get_event_loop())
+    try:
+        while (chunk := buffer.get()) is not _STREAM_END:
+            yield chunk
+        future.result()  # 把流中的异常抛回脚本线程
+    finally:
+        future.cancel()
+
+
+# -------------------- Helpers --------------------
+
+
+QUOTE_CLEAN_CHARS = "\"'“”‘’`"
+MAX_MENU_ITEMS = 6
 
 
 def clean_restaurant_name(name: str | None) -> str:
@@ -190,11 +283,18 @@ def clean_restaurant_name(name: str | None) -> str:
     return cleaned.strip()
 
 
+def clean_items(items: List[str]) -> List[str]:
+    # 去空白、去空项、按原顺序去重，再截断
+    cleaned = dict.fromkeys(x.strip() for x in items)
+    cleaned.pop("", None)
+    return list(cleaned)[:MAX_MENU_ITEMS]
+
+
 def to_display_list(items: List[str], style: str) -> str:
     if style == "Bullets":
-        return "\n".join([f"- {x}" for x in items])
+        return "\n".join(f"- {x}" for x in items)
     elif style == "Numbered":
-        return "\n".join([f"{i+1}. {x}" for i, x in enumerate(items)])
+        return "\n".join(f"{i+1}. {x}" for i, x in enumerate(items))
     return "\n".join(items)
 
 
@@ -207,112 +307,456 @@ def to_export_v2(
     drinks: List[str] | None = None,
 ) -> str:
     drinks = drinks or []
+    buf = io.StringIO()
     if fmt == "Markdown":
-        parts = []
-        parts.append(f"## {name}")
+        buf.write(f"## {name}\n\n")
         if slogan:
-            parts.append(f"*{slogan}*")
+            buf.write(f"*{slogan}*\n\n")
         if description:
-            parts.append(description)
+            buf.write(f"{description}\n\n")
 
-        parts.append("\n### Menu Items")
-        parts.append("\n".join([f"- {x}" for x in items]))
+        buf.write("\n### Menu Items\n\n")
+        buf.write("\n".join(f"- {x}" for x in items))
 
-        parts.append("\n### Drinks")
+        buf.write("\n\n\n### Drinks\n\n")
         if drinks:
-            parts.append("\n".join([f"- {x}" for x in drinks]))
+            buf.write("\n".join(f"- {x}" for x in drinks))
         else:
-            parts.append("_(none)_")
-        return "\n\n".join(parts).strip()
+            buf.write("_(none)_")
     else:
-        parts = [name]
+        buf.write(f"{name}\n")
         if slogan:
-            parts.append(slogan)
+            buf.write(f"{slogan}\n")
         if description:
-            parts.append(description)
-        parts.append("\nMenu Items")
-        parts.extend(items)
-        parts.append("\nDrinks")
-        parts.extend(drinks if drinks else ["(none)"])
-        return "\n".join(parts).strip()
+            buf.write(f"{description}\n")
+        buf.write("\nMenu Items\n")
+        for x in items:
+            buf.write(f"{x}\n")
+        buf.write("\nDrinks\n")
+        buf.write("\n".join(drinks) if drinks else "(none)")
+    return buf.getvalue().strip()
+
+
+# -------------------- Generation --------------------
+
+
+RESULT_CACHE_TTL = 3600
+RESULT_CACHE_MAX_ENTRIES = 256
+
+
+class ResultCache:
+    # 进程内共享的 (cuisine, temperature) -> 结果 映射：带 TTL 与条目上限（LRU 淘汰），
+    # put 总是覆盖旧值，Regenerate / Batch 的新结果会替换掉之前的
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple, tuple[float, dict]] = OrderedDict()
+
+    def get(self, key: tuple) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, result = entry
+            if time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return result
+
+    def put(self, key: tuple, result: dict) -> None:
+        with self._lock:
+            self._entries[key] = (time.time(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
 
 
-# -------------------- Main Panel --------------------
-col_left, col_right = st.columns([2.2, 1])
-
-with col_left:
+@st.cache_resource(show_spinner=False)
+def get_result_cache() -> ResultCache:
+    return ResultCache(RESULT_CACHE_TTL, RESULT_CACHE_MAX_ENTRIES)
+
+
+def generate(
+    cuisine: str,
+    temperature: float,
+    api_key: str,
+    name_slot,
+    description_slot,
+    fresh: bool = False,
+) -> dict:
+    # fresh：details 调用跳过 LangChain 的 LLM 缓存，否则 Regenerate 会拿回同样的结果
+    # （流式的店名 / 描述本就不经过该缓存）
+    name_chain, details_chain, description_chain = get_chain(
+        temperature, api_key, cache=not fresh)
+
+    # 先流式输出店名：首个 token 到达即开始渲染
+    with name_slot:
+        raw_name = st.write_stream(stream_on_loop(name_chain.astream({"cuisine": cuisine})))
+    rest_name = clean_restaurant_name(raw_name)
+    if not rest_name:
+        raise ValueError("No restaurant name was returned by the model.")
+
+    # 结构化字段与描述流同在后台 loop 上并发请求（共用 HTTP/2 连接）；描述边到边渲染，
+    # 用阅读时间掩盖等待
+    inputs = {"cuisine": cuisine, "restaurant_name": rest_name}
+    details_future = asyncio.run_coroutine_threadsafe(
+        details_chain.ainvoke(inputs), get_event_loop())
+    description = ""
+    try:
+        for chunk in stream_on_loop(description_chain.astream(inputs)):
+            description += chunk
+            description_slot.markdown(description)
+    except BaseException:
+        # 描述流失败时没人会再取 details 的结果，别让它在后台空跑
+        details_future.cancel()
+        raise
+
+    with st.spinner("Cooking..."):
+        res = details_future.result()
+    return build_result(rest_name, res, description)
+
+
+def build_result(rest_name: str, res: RestaurantDetails, description: str) -> dict:
+    # 结构化输出无需正则清洗，但模型仍可能给出空项 / 重复项
+    items = clean_items(res.menu_items)
+    if not items:
+        raise ValueError("No menu items were returned by the model.")
+
+    return {
+        "rest_name": rest_name,
+        "items": items,
+        "drinks": clean_items(res.drink_items),
+        "slogan": res.slogan.strip(),
+        "description": description.strip(),
+    }
+
+
+# 防抖：选择稳定这么久之后才真正发请求；在此之前被取消不会产生任何计费请求
+PREFETCH_DELAY = 2.0
+
+
+async def prefetch(
+    cuisine: str, fired: threading.Event, name_chain, details_chain, description_chain
+) -> dict:
+    await asyncio.sleep(PREFETCH_DELAY)
+    fired.set()
+    rest_name = clean_restaurant_name(await name_chain.ainvoke({"cuisine": cuisine}))
+    if not rest_name:
+        raise ValueError("No restaurant name was returned by the model.")
+    inputs = {"cuisine": cuisine, "restaurant_name": rest_name}
+    res, description = await asyncio.gather(
+        details_chain.ainvoke(inputs), description_chain.ainvoke(inputs))
+    return build_result(rest_name, res, description)
+
+
+def _drop_prefetch() -> dict | None:
+    task = st.session_state.pop("prefetch", None)
+    if task and task["fired"].is_set():
+        # 每个会话只预取一次：已经真正发出过请求，就不再为后续选择预取
+        st.session_state["prefetch_spent"] = True
+    return task
+
+
+def start_prefetch(cache_key: tuple, api_key: str) -> None:
+    # 预测执行：用户还在犹豫时就为当前选择提前生成；选择变化时取消旧任务
+    task = st.session_state.get("prefetch")
+    if task and task["key"] == cache_key:
+        return
+    if task:
+        task["future"].cancel()
+        _drop_prefetch()
+    if st.session_state.get("prefetch_spent"):
+        return
+    if get_result_cache().get(cache_key) is not None:
+        return
+    fired = threading.Event()
+    future = asyncio.run_coroutine_threadsafe(
+        prefetch(cache_key[0], fired, *get_chain(cache_key[1], api_key, cache=False)),
+        get_event_loop())
+    st.session_state["prefetch"] = {"key": cache_key, "future": future, "fired": fired}
+
+
+def take_prefetch(cache_key: tuple) -> dict | None:
+    task = st.session_state.get("prefetch")
+    if not task or task["key"] != cache_key:
+        return None
+    _drop_prefetch()
+    future = task["future"]
+    # 只用已经完成的预取；还在进行中就取消，走流式生成，保证首个 token 尽快出现
+    if not future.done():
+        future.cancel()
+        return None
+    if future.cancelled() or future.exception() is not None:
+        return None
+    return future.result()
+
+
+@st.fragment
+def generation_panel(
+    cuisine: str, temperature: float, bullet_style: str, export_fmt: str, api_key: str | None
+) -> None:
+    # 按钮点击只重跑本面板：不再重绘页头、侧边栏、图片与 Batch 区域
     st.subheader("Generate")
-    run_btn = st.button("Generate Name & Menu", use_container_width=True)
+    col_run, col_regen = st.columns([3, 1])
+    with col_run:
+        run_btn = st.button("Generate Name & Menu", use_container_width=True)
+    with col_regen:
+        # 同一 cuisine / temperature 默认命中缓存；Regenerate 跳过缓存并覆盖旧结果
+        regen_btn = st.button("♻️ Regenerate", use_container_width=True)
+
+    result_key = (cuisine, round(temperature, 1))
+    last = st.session_state.get("last_result")
+    # 只改了菜单样式 / 导出格式：复用上次结果，纯本地重新格式化，不再请求 API
+    reuse = last is not None and last["key"] == result_key and not regen_btn
 
     # 体验：按下按钮才运行，避免每次交互都打 API
-    if run_btn:
-        if not effective_key:
-            st.error(
-                "Please provide OPENAI_API_KEY (environment/secrets or sidebar input).")
-        else:
-            llm = get_llm(temperature, effective_key)
-            chain = build_chain(llm)
-            with st.spinner("Cooking..."):
-                try:
-                    res = chain.invoke({"cuisine": cuisine})
-                    rest_name = clean_restaurant_name(res.get("restaurant_name"))
-                    items = normalize_lines(res.get("menu_items"))
-
-                    # NEW: drinks, slogan, description
-                    drinks = normalize_lines(res.get("drink_items"))
-                    slogan = (res.get("slogan") or "").strip()
-                    description = (res.get("description") or "").strip()
-
-                    if not rest_name:
-                        raise ValueError("No restaurant name was returned by the model.")
-                    if not items:
-                        raise ValueError("No menu items were returned by the model.")
-                    
-                    st.success("Generated!")
-                    # Title + Slogan
-                    st.markdown(f"## {rest_name}")
-                    if slogan:
-                         st.markdown(f"*{slogan}*")
-                    # Description
-                    if description:
-                         st.markdown(description)
-                    # Food Menu
-                    st.markdown("### Menu Items")
-                    st.markdown(to_display_list(items, bullet_style))
-                    # Drinks
-                    st.markdown("### Drinks")
-                    if drinks:
-                         st.markdown(to_display_list(drinks, bullet_style))
-                    else:
-                        st.caption("No drinks returned. Try again or adjust temperature.")
-
-                    # 复制到剪贴板（以文本框提供）
-                    st.caption("Copy / Export")
-                    content = to_export_v2(
-                        rest_name, items, export_fmt,
-                        slogan=slogan, description=description, drinks=drinks
-                    )
-                    st.text_area("Output", value=content, height=180)
-
-                    # 下载按钮
-                    st.download_button(
-                        "Download",
-                        data=content.encode("utf-8"),
-                        file_name=f"{rest_name.replace(' ','_')}.{'md' if export_fmt=='Markdown' else 'txt'}",
-                        mime="text/markdown" if export_fmt == "Markdown" else "text/plain",
-                        use_container_width=True,
-                    )
-                except Exception as e:
-                    st.exception(e)
+    if (run_btn or regen_btn) and not reuse and not api_key:
+        st.error(
+            "Please provide OPENAI_API_KEY (environment/secrets or sidebar input).")
+    elif run_btn or regen_btn or reuse:
+        try:
+            status = st.empty()
+            name_slot = st.empty()
+            slogan_slot = st.empty()
+            description_slot = st.empty()
+            generated = False
+            if reuse:
+                # 先查结果缓存：Batch 可能已经覆盖了这个 key，不能被旧的 last_result 挡住
+                result = get_result_cache().get(result_key) or last["result"]
+                if result is not last["result"]:
+                    st.session_state["last_result"] = {"key": result_key, "result": result}
+            else:
+                result = None if regen_btn else get_result_cache().get(result_key)
+                if result is None:
+                    if not regen_btn:
+                        result = take_prefetch(result_key)
+                    if result is None:
+                        result = generate(
+                            cuisine, result_key[1], api_key,
+                            name_slot, description_slot, fresh=regen_btn)
+                    generated = True
+                    get_result_cache().put(result_key, result)
+                st.session_state["last_result"] = {"key": result_key, "result": result}
+            rest_name = result["rest_name"]
+            items = result["items"]
+            drinks = result["drinks"]
+            slogan = result["slogan"]
+            description = result["description"]
+
+            name_slot.markdown(f"## {rest_name}")
+            # 只有本次真正生成（或取用预取）时才提示；复用 / 缓存命中不提示
+            if generated:
+                status.success("Generated!")
+            # Slogan
+            if slogan:
+                slogan_slot.markdown(f"*{slogan}*")
+            # Description
+            if description:
+                description_slot.markdown(description)
+            # Food Menu
+            st.markdown("### Menu Items")
+            st.markdown(to_display_list(items, bullet_style))
+            # Drinks
+            st.markdown("### Drinks")
+            if drinks:
+                st.markdown(to_display_list(drinks, bullet_style))
+            else:
+                st.caption("No drinks returned. Try again or adjust temperature.")
+
+            # 复制到剪贴板（以文本框提供）
+            st.caption("Copy / Export")
+            content = to_export_v2(
+                rest_name, items, export_fmt,
+                slogan=slogan, description=description, drinks=drinks
+            )
+            st.text_area("Output", value=content, height=180)
+
+            # 下载按钮
+            st.download_button(
+                "Download",
+                data=content.encode("utf-8"),
+                file_name=f"{rest_name.replace(' ','_')}.{'md' if export_fmt=='Markdown' else 'txt'}",
+                mime="text/markdown" if export_fmt == "Markdown" else "text/plain",
+                use_container_width=True,
+            )
+        except Exception as e:
+            st.exception(e)
     else:
         st.info("Choose a cuisine and click **Generate Name & Menu**.")
 
+
+# -------------------- Batch --------------------
+
+
+def get_openai_client(api_key: str) -> openai.OpenAI:
+    return _lc().openai.OpenAI(api_key=api_key, http_client=get_http_clients()[0])
+
+
+def submit_batch(temp: float, api_key: str) -> str:
+    # 14 个菜系打包成一个 Batch：约半价，且不占用实时请求的速率限制
+    requests = [
+        {
+            "custom_id": c,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": "gpt-4o-mini",
+                "temperature": temp,
+                "max_tokens": DETAILS_MAX_TOKENS,
+                "messages": _lc().convert_to_openai_messages(
+                    get_prompts().concept.format_messages(cuisine=c)),
+                "response_format": {
+                    "type": "json_schema",
+                    "json_schema": {
+                        "name": "RestaurantConcept",
+                        "schema": RestaurantConcept.model_json_schema(),
+                    },
+                },
+            },
+        }
+        for c in CUISINES
+    ]
+    client = get_openai_client(api_key)
+    batch_file = client.files.create(
+        file=("batch.jsonl", "\n".join(json.dumps(r) for r in requests).encode("utf-8")),
+        purpose="batch",
+    )
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+    )
+    return batch.id
+
+
+def fetch_batch(batch_id: str, api_key: str) -> tuple[str, dict[str, dict], List[str]]:
+    # 轮询每 30s 一次，本身就是重试：关闭 SDK 内部重试，避免服务异常时页面被长时间阻塞
+    client = get_openai_client(api_key).with_options(max_retries=0, timeout=10.0)
+    batch = client.batches.retrieve(batch_id)
+    if batch.status != "completed":
+        return batch.status, {}, []
+
+    counts = batch.request_counts
+    if not batch.output_file_id:
+        failed = f"{counts.failed} of {counts.total}" if counts else "all"
+        note = f" See error file {batch.error_file_id}." if batch.error_file_id else ""
+        return batch.status, {}, [
+            f"Batch {batch_id} returned no results: {failed} requests failed.{note}"]
+
+    results: dict[str, dict] = {}
+    dropped: List[str] = []
+    for line in client.files.content(batch.output_file_id).text.splitlines():
+        row = json.loads(line)
+        response = row.get("response") or {}
+        if response.get("status_code") != 200:
+            dropped.append(f"{row.get('custom_id')} (HTTP {response.get('status_code')})")
+            continue
+        try:
+            concept = RestaurantConcept.model_validate_json(
+                response["body"]["choices"][0]["message"]["content"])
+            rest_name = clean_restaurant_name(concept.restaurant_name)
+            if not rest_name:
+                raise ValueError("empty restaurant name")
+            results[row["custom_id"]] = build_result(
+                rest_name, concept, concept.description)
+        except (ValueError, KeyError, IndexError, TypeError):
+            # 单个菜系的响应结构异常 / 解析失败不影响其余结果，但要告诉用户
+            dropped.append(f"{row.get('custom_id')} (unparseable response)")
+
+    warnings: List[str] = []
+    if counts and counts.failed:
+        note = f" (error file {batch.error_file_id})" if batch.error_file_id else ""
+        warnings.append(f"{counts.failed} of {counts.total} batch requests failed{note}.")
+    if dropped:
+        warnings.append("Dropped: " + ", ".join(dropped) + ".")
+    return batch.status, results, warnings
+
+
+@st.fragment(run_every="30s")
+def batch_poller(api_key: str) -> None:
+    batch = st.session_state.get("batch")
+    if batch is None:
+        return
+    try:
+        status, results, warnings = fetch_batch(batch["id"], api_key)
+    except Exception as e:
+        # 临时故障（5xx / 网络）：提示一下，下一次定时轮询继续
+        st.warning(f"Could not check batch {batch['id']} ({e}). Retrying in 30 seconds…")
+        return
+    if status in ("failed", "expired", "cancelled"):
+        # 整页重跑以停止轮询；错误信息留到重跑后显示
+        del st.session_state["batch"]
+        st.session_state["batch_error"] = f"Batch {batch['id']} {status}."
+        st.rerun(scope="app")
+    elif status == "completed":
+        del st.session_state["batch"]
+        st.session_state["batch_results"] = results
+        st.session_state["batch_warnings"] = warnings
+        # 结果同时写入结果缓存：之后对这些菜系点 Generate 直接命中，不再请求 API
+        for c, result in results.items():
+            get_result_cache().put((c, batch["temperature"]), result)
+        st.rerun(scope="app")
+    else:
+        st.info(f"Batch {batch['id']} is {status}. Checking again every 30 seconds…")
+
+
+# -------------------- Main Panel --------------------
+if effective_key:
+    get_http_clients()
+    start_prefetch(
+        (cuisine, round(temperature, 1)),
+        effective_key,
+    )
+
+col_left, col_right = st.columns([2.2, 1])
+
+with col_left:
+    generation_panel(cuisine, temperature, bullet_style, export_fmt, effective_key)
+
 with col_right:
     st.subheader("Preview")
     st.image(
-        "https://images.unsplash.com/photo-1526318472351-c75fcf070305?q=80&w=1200&auto=format&fit=crop",
+        HERO_IMAGE_URL,
         caption="Fresh from the kitchen",
         use_container_width=True,
     )
 
+st.divider()
+st.subheader("Batch")
+st.caption("Generate all cuisines at once via the OpenAI Batch API — about half the "
+           "cost, results usually arrive within minutes (up to 24h).")
+if st.button("Batch-generate all cuisines", disabled="batch" in st.session_state):
+    if not effective_key:
+        st.error("Please provide OPENAI_API_KEY (environment/secrets or sidebar input).")
+    else:
+        try:
+            st.session_state["batch"] = {
+                "id": submit_batch(round(temperature, 1), effective_key),
+                "temperature": round(temperature, 1),
+            }
+            st.session_state.pop("batch_results", None)
+            st.session_state.pop("batch_warnings", None)
+        except Exception as e:
+            st.exception(e)
+
+if "batch_error" in st.session_state:
+    st.error(st.session_state.pop("batch_error"))
+for warning in st.session_state.get("batch_warnings", []):
+    st.warning(warning)
+if "batch" in st.session_state and effective_key:
+    batch_poller(effective_key)
+
+batch_results = st.session_state.get("batch_results")
+if batch_results:
+    grid = st.columns(3)
+    for i, (c, result) in enumerate(batch_results.items()):
+        with grid[i % 3].container(border=True):
+            st.caption(c)
+            st.markdown(f"### {result['rest_name']}")
+            if result["slogan"]:
+                st.markdown(f"*{result['slogan']}*")
+            st.markdown(to_display_list(result["items"], bullet_style))
+
 st.caption("© 2025 Skye Yin – Built with Streamlit + LangChain (LCEL)")